@@ -1,31 +1,72 @@
+import re
+
+import numpy as np
 import pandas as pd
-from collections import defaultdict
+
+# Text columns are scanned with pandas' nullable string dtype, backed by
+# PyArrow's vectorized string kernels when pyarrow is installed.
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = 'string[pyarrow]'
+except ImportError:
+    STRING_DTYPE = 'string'
+
+# The match report is written with xlsxwriter when it is installed, which is
+# faster than pandas' default openpyxl writer. Its constant_memory mode is not
+# used: pandas writes cells column by column, and that mode only keeps the
+# current row, so earlier rows would come out empty.
+try:
+    import xlsxwriter  # noqa: F401
+    EXCEL_WRITER_ENGINE = 'xlsxwriter'
+except ImportError:
+    EXCEL_WRITER_ENGINE = 'openpyxl'
 
 # --- PREPROCESSING LOGIC ---
 
+# Fixed category order for gender labels, so the matchers can compare codes:
+# 0 = Unknown, 1 = Male, 2 = Female.
+GENDER_CATEGORIES = ['Unknown', 'Male', 'Female']
+
+# Faculty keywords and the campus each one belongs to, in priority order: a
+# faculty name containing several keywords gets the first one listed here
+# (e.g. 'Law and Business' -> 'Business', campus '1').
+CAMPUS_BY_FACULTY_KEY = {'Business': '1', 'Medicine': '1', 'Law': '2'}
+
+
+def normalize_column_name(name):
+    """
+    Lowercases a column header, strips surrounding spaces and turns runs of
+    spaces and punctuation into a single underscore, so every column is a
+    valid Python identifier (e.g. 'Mr./ms.' -> 'mr_ms', 'Student Phone' -> 'student_phone').
+    """
+    return re.sub(r'\W+', '_', str(name).lower().strip()).strip('_')
+
+
 def preprocess_data(students_df, mentors_df):
     """
     Prepares student and mentor data for matching by standardizing columns,
     converting age to a number, mapping titles to gender, and mapping faculties to campuses.
     """
-    # 1. Standardize all column names to lowercase and remove leading/trailing spaces
-    students_df.columns = students_df.columns.str.lower().str.strip()
-    mentors_df.columns = mentors_df.columns.str.lower().str.strip()
+    # 1. Standardize all column names to lowercase identifiers without leading/trailing spaces
+    for df in [students_df, mentors_df]:
+        df.columns = df.columns.map(normalize_column_name)
     
     # 2. Process Mentors: Map 'mr./ms.' to a new 'gender' column
-    if 'mr./ms.' not in mentors_df.columns:
+    if 'mr_ms' not in mentors_df.columns:
         raise KeyError("The required 'Mr./ms.' column was not found in the Mentors sheet.")
         
-    def map_title_to_gender(title):
-        if not isinstance(title, str): return 'Unknown'
-        title_clean = title.lower().strip()
-        if 'mr' in title_clean: return 'Male'
-        # REVERTED as requested: The line below is from your original code.
-        if 'ms' in title_clean or 'ms' in title_clean: return 'Female'
-        return 'Unknown'
-        
-    mentors_df['gender'] = mentors_df['mr./ms.'].apply(map_title_to_gender)
-    students_df['gender'] = students_df['mr./ms.'].apply(map_title_to_gender)
+    def map_title_to_gender(titles):
+        # The first two letters decide the title ('Mr.'/'Mrs.' -> 'mr', 'Ms.' -> 'ms'),
+        # so only those are lowercased rather than the whole string.
+        prefix = titles.astype(STRING_DTYPE).str.lstrip().str[:2].str.lower()
+        return np.select(
+            [prefix.eq('mr').to_numpy(dtype=bool, na_value=False), prefix.eq('ms').to_numpy(dtype=bool, na_value=False)],
+            ['Male', 'Female'],
+            default='Unknown',
+        )
+
+    mentors_df['gender'] = map_title_to_gender(mentors_df['mr_ms'])
+    students_df['gender'] = map_title_to_gender(students_df['mr_ms'])
     print("Successfully mapped 'Mr./ms.' column to a 'gender' column for mentors and student.")
     
     # 3. Process Students: Clean up the gender_preference column
@@ -35,51 +76,43 @@ def preprocess_data(students_df, mentors_df):
 
     # 4. Process Both: Map 'faculty' to a new 'campus' column and clean 'age'
  
-    campus_1_keys = ['Business','Medicine']
-    campus_2_keys = ['Law']
-
-    def assign_campus(faculty_name):
-        if not isinstance(faculty_name, str): return 'Unknown'
-        if any(key in faculty_name for key in campus_1_keys): return '1'
-        if any(key in faculty_name for key in campus_2_keys): return '2'
-        return 'Unknown'
-
-    def shorten_school(faculty_name):
-        """
-        Checks if a faculty name string contains any of the keys.
-        If it does, it returns the specific key that was found.
-        """
-        if not isinstance(faculty_name, str):
-            return 'Unknown'
-
-        # Check Campus 1 keys
-        for key in campus_1_keys:
-            if key in faculty_name:
-                return key  # Return the specific key that matched
-
-        # Check Campus 2 keys
-        for key in campus_2_keys:
-            if key in faculty_name:
-                return key  # Return the specific key that matched
-
-        # If no match was found in either list
-        return 'Unknown'
-    
+    # Faculty names are lowercased once per sheet and searched for lowercase keys,
+    # so 'LAW' or 'business' match too.
+    faculty_keys = list(CAMPUS_BY_FACULTY_KEY)
+
     for df in [students_df, mentors_df]:
         if 'faculty' not in df.columns:
             raise KeyError("A 'faculty' column is required but was not found.")
-        df['campus'] = df['faculty'].apply(assign_campus)
-        df['campus_key'] = df['faculty'].apply(shorten_school)
+        # np.select takes the first key found in CAMPUS_BY_FACULTY_KEY order;
+        # the campus is looked up from that key.
+        faculty_lowercase = df['faculty'].astype(STRING_DTYPE).str.lower()
+        key_found = [
+            faculty_lowercase.str.contains(key.lower(), regex=False).to_numpy(dtype=bool, na_value=False)
+            for key in faculty_keys
+        ]
+        campus_key = pd.Series(np.select(key_found, faculty_keys, default='Unknown'), index=df.index)
+        df['campus'] = campus_key.map(CAMPUS_BY_FACULTY_KEY).fillna('Unknown')
+        df['campus_key'] = campus_key
 
         if 'age' not in df.columns:
             raise KeyError("An 'age' column is required but was not found.")
-        df['age_str'] = df['age'].astype(str).str.extract('(\d+)')
-        df['age'] = pd.to_numeric(df['age_str'], errors='coerce')
-        df.drop(columns=['age_str'], inplace=True)
+        df['age'] = pd.to_numeric(df['age'].astype(str).str.extract(r'(\d+)', expand=False), errors='coerce')
         
         if df['age'].isnull().any():
             print(f"Warning: Some 'age' values could not be converted to numbers and were set to NaN.")
 
+    # 5. Encode the labels compared by the matching rules as categoricals with a
+    # fixed code order shared by both sheets ('Unknown' is always code 0).
+    campus_categories = ['Unknown'] + sorted(set(CAMPUS_BY_FACULTY_KEY.values()))
+    for df in [students_df, mentors_df]:
+        df['gender'] = pd.Categorical(df['gender'], categories=GENDER_CATEGORIES)
+        df['campus'] = pd.Categorical(df['campus'], categories=campus_categories)
+    if 'gender_preference' in students_df.columns:
+        # Answers such as 'Either way is fine!' are kept as extra categories after the fixed ones.
+        preferences = students_df['gender_preference']
+        other_preferences = [p for p in preferences.dropna().unique() if p not in GENDER_CATEGORIES]
+        students_df['gender_preference'] = pd.Categorical(preferences, categories=GENDER_CATEGORIES + other_preferences)
+
     print("Successfully converted 'age' column to a numeric type.")
     print("Successfully mapped 'faculty' column to a 'campus' column for all participants.")
     return students_df, mentors_df
@@ -87,71 +120,226 @@ def preprocess_data(students_df, mentors_df):
 
 # --- MATCHING LOGIC ---
 
+def oldest_first(df):
+    """
+    Returns the row positions of df ordered by age, oldest first. Rows with the
+    same age keep their sheet order and rows without an age come last.
+    """
+    return np.argsort(-df['age'].to_numpy(dtype=float), kind='stable')
+
+
+def build_matches_frame(students_df, mentors_df, student_positions, mentor_positions,
+                        same_campus, match_reason):
+    """
+    Builds the match report column by column from aligned arrays of
+    positional student and mentor indices, instead of one dict per match.
+    """
+    def student_column(column):
+        return students_df[column].to_numpy()[student_positions]
+
+    def mentor_column(column):
+        return mentors_df[column].to_numpy()[mentor_positions]
+
+    return pd.DataFrame({
+        'Mentor Name': mentor_column('name') if 'name' in mentors_df.columns else None,
+        'Student_Index': students_df.index.to_numpy()[student_positions],
+        'Student_Age': student_column('age'),
+        'Student Gender Preference': (
+            student_column('gender_preference') if 'gender_preference' in students_df.columns else np.nan
+        ),
+        'Mentor_Index': mentors_df.index.to_numpy()[mentor_positions],
+        'Mentor_Age': mentor_column('age'),
+        'Mentor_Title': mentor_column('mr_ms'),
+        'Match_Reason': match_reason,
+        'Same_Campus_Match': np.where(same_campus, 'Yes', 'No'),
+        'Assigned_Campus': student_column('campus'),
+        'Student Phone': student_column('student_phone'),
+        'Student Email': student_column('student_email'),
+        'Student Personal Email': student_column('student_personal_email'),
+        'Disability': student_column('disability'),
+        'Activity Preference': student_column('activity_1'),
+    })
+
+
 def match_by_age_and_rules(students_df, mentors_df, max_mentees_per_mentor):
     """
     Matches oldest students with oldest mentors, with a mandatory gender rule
     and a campus preference tie-breaker.
     """
-    students_sorted = students_df.sort_values(by='age', ascending=False)
-    mentors_sorted = mentors_df.sort_values(by='age', ascending=False)
-    
-    mentor_mentee_count = defaultdict(int)
-    matches = []
-
-    for student_index, student in students_sorted.iterrows():
-        best_mentor = None
-        highest_score = -1
-
-        for mentor_index, mentor in mentors_sorted.iterrows():            
-            # --- HARD CONSTRAINTS CHECK ---
-            # Rule 1: Mandatory Gender Preference
-            student_pref = student.get('gender_preference')
-            mentor_gender = mentor.get('gender')
-            
-            is_male_preference_miss = (student_pref == 'Male' and mentor_gender != 'Male')
-            is_female_preference_miss = (student_pref == 'Female' and mentor_gender != 'Female')
-
-            if is_male_preference_miss or is_female_preference_miss:
-                continue 
-
-            # Rule 2: Mentor Capacity
-            if mentor_mentee_count[mentor_index] >= max_mentees_per_mentor:
-                continue 
-
-            # --- Tie-Breaker Scoring ---
-            score = 0
-            if student.get('campus') == mentor.get('campus') and student.get('campus') != 'Unknown':
-                score = 1 
-            
-            if score > highest_score:
-                highest_score = score
-                best_mentor = mentor
-
-        if best_mentor is not None:
-            matches.append({
-                'Mentor Name': best_mentor.get('name'),
-                'Student_Index': student_index,
-                'Student_Age': student['age'],
-                'Student Gender Preference': student['gender_preference'],
-                'Mentor_Index': best_mentor.name,
-                'Mentor_Age': best_mentor['age'],
-                'Mentor_Title': best_mentor['mr./ms.'],
-                'Match_Reason': 'Age Priority + Gender Rule + Campus Preference',
-                'Same_Campus_Match': 'Yes' if highest_score > 0 else 'No',
-                'Assigned_Campus': student['campus'],
-                'Student Phone': student['student_phone'],
-                'Student Email': student['student_email'],
-                'Student Personal Email': student['student_personal_email'],
-                'Disability': student['disability'],
-                'Activity Preference': student['activity_1'],
-            })
-            mentor_mentee_count[best_mentor.name] += 1
-
-    return pd.DataFrame(matches)
+    # Only the order of the rows is needed, so both sheets are ranked by age with
+    # a positional permutation instead of sorting copies of the whole frames.
+    student_order = oldest_first(students_df)
+    mentor_order = oldest_first(mentors_df)
+
+    # Mentors are taken oldest first, so each student simply takes the
+    # first mentor with spare capacity from the list allowed by their gender
+    # preference, preferring the same campus. The candidate lists are built once
+    # and walked with persistent head pointers: a mentor who fills up never
+    # frees a slot again, so every pointer only moves forward.
+    #
+    # The rules work on the category codes set up by preprocess_data, and the
+    # walk runs in _greedy_match_kernel:
+    #   preference group: 0 = any gender, 1 = Male, 2 = Female
+    #   campus: 0 = Unknown, 1.. = known campuses
+    mentor_gender = mentors_df['gender'].cat.codes.to_numpy()[mentor_order]
+    mentor_campus_code = mentors_df['campus'].cat.codes.to_numpy()[mentor_order]
+    student_campus_code = students_df['campus'].cat.codes.to_numpy()[student_order]
+
+    if 'gender_preference' in students_df.columns:
+        student_pref = students_df['gender_preference'].cat.codes.to_numpy()[student_order]
+        student_group = np.where((student_pref == 1) | (student_pref == 2), student_pref, 0)
+    else:
+        student_group = np.zeros(len(students_df), dtype=np.int64)
+
+    # Candidate lists are stored back to back in one array; list number
+    # group * buckets_per_group + campus spans candidates[heads[b]:bucket_ends[b]],
+    # where campus 0 holds every mentor of the group.
+    mentor_positions = np.arange(len(mentors_df))
+    buckets_per_group = len(mentors_df['campus'].cat.categories)
+    # When no student asks for a specific gender only the any-gender lists are
+    # needed, so the gender partition of the mentors is skipped entirely.
+    group_masks = [np.ones(len(mentors_df), dtype=bool)]
+    if student_group.any():
+        group_masks += [mentor_gender == 1, mentor_gender == 2]
+    buckets = []
+    for group_mask in group_masks:
+        positions = mentor_positions[group_mask]
+        buckets.append(positions)
+        for campus_code in range(1, buckets_per_group):
+            buckets.append(positions[mentor_campus_code[positions] == campus_code])
+    bucket_sizes = np.array([len(bucket) for bucket in buckets], dtype=np.int64)
+    bucket_ends = np.cumsum(bucket_sizes)
+    heads = bucket_ends - bucket_sizes
+    candidates = np.concatenate(buckets).astype(np.int64)
+
+    capacity_left = np.full(len(mentors_df), max_mentees_per_mentor, dtype=np.int64)
+    matched_mentor, matched_same_campus = _greedy_match_kernel(
+        student_group.astype(np.int64), student_campus_code.astype(np.int64), candidates, heads, bucket_ends,
+        buckets_per_group, capacity_left,
+    )
+
+    matched_students = np.flatnonzero(matched_mentor >= 0)
+    return build_matches_frame(
+        students_df, mentors_df,
+        student_order[matched_students], mentor_order[matched_mentor[matched_students]],
+        matched_same_campus[matched_students],
+        'Age Priority + Gender Rule + Campus Preference',
+    )
+
+
+def _next_available_mentor(bucket, candidates, heads, bucket_ends, capacity_left):
+    """
+    Advances the head pointer of a candidate list past full mentors and
+    returns the position of the first mentor with capacity left, or -1.
+    """
+    head = heads[bucket]
+    end = bucket_ends[bucket]
+    while head < end and capacity_left[candidates[head]] == 0:
+        head += 1
+    heads[bucket] = head
+    return candidates[head] if head < end else -1
+
+
+def _greedy_match_kernel(student_group, student_campus, candidates, heads, bucket_ends,
+                         buckets_per_group, capacity_left):
+    """
+    Assigns each student, in order, the first mentor with capacity left from
+    their same-campus candidate list, falling back to the list for any campus.
+    Returns the mentor position per student (-1 if unmatched) and whether the
+    match shares a campus.
+    """
+    matched_mentor = np.full(student_group.shape[0], -1, dtype=np.int64)
+    matched_same_campus = np.zeros(student_group.shape[0], dtype=np.bool_)
+    free_slots = capacity_left.sum()
+
+    for s in range(student_group.shape[0]):
+        # Once every mentor is full no remaining student can be matched.
+        if free_slots == 0:
+            break
+
+        # Rule 1 (Mandatory Gender Preference) picks the group of lists,
+        # Rule 2 (Mentor Capacity) is enforced by _next_available_mentor.
+        base = student_group[s] * buckets_per_group
+        best = -1
+        if student_campus[s] > 0:
+            best = _next_available_mentor(base + student_campus[s], candidates, heads, bucket_ends, capacity_left)
+            matched_same_campus[s] = best >= 0
+        if best < 0:
+            best = _next_available_mentor(base, candidates, heads, bucket_ends, capacity_left)
+        if best >= 0:
+            matched_mentor[s] = best
+            capacity_left[best] -= 1
+            free_slots -= 1
+
+    return matched_mentor, matched_same_campus
+
+
+def match_by_assignment(students_df, mentors_df, max_mentees_per_mentor):
+    """
+    Alternative to match_by_age_and_rules that solves the pairing as a
+    min-cost bipartite assignment instead of greedily. The mandatory gender
+    rule and mentor capacity still hold; among the allowed pairings the
+    solver minimizes, over all students at once, the gap between student and
+    mentor age rank minus a bonus for sharing a campus.
+
+    Requires scipy (pip install scipy).
+    """
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except ImportError as e:
+        raise ImportError("match_by_assignment requires scipy. Install it with 'pip install scipy'.") from e
+
+    student_order = oldest_first(students_df)
+    mentor_order = oldest_first(mentors_df)
+
+    # Age compatibility: students and mentors at the same relative age rank
+    # (oldest with oldest) cost 0, opposite ends of the range cost 1.
+    student_rank = students_df['age'].rank(pct=True, na_option='bottom').to_numpy()[student_order]
+    mentor_rank = mentors_df['age'].rank(pct=True, na_option='bottom').to_numpy()[mentor_order]
+    cost = np.abs(student_rank[:, None] - mentor_rank[None, :])
+
+    # Campus tie-breaker: a shared, known campus outweighs any age gap.
+    student_campus = students_df['campus'].cat.codes.to_numpy()[student_order]
+    mentor_campus = mentors_df['campus'].cat.codes.to_numpy()[mentor_order]
+    same_campus = (student_campus[:, None] == mentor_campus[None, :]) & (student_campus[:, None] != 0)
+    cost -= same_campus
+
+    # Mandatory gender preference: forbidden pairs get a cost no valid
+    # assignment can reach and are dropped from the result below.
+    forbidden_cost = float(len(students_df) + 1) * 2
+    if 'gender_preference' in students_df.columns:
+        student_pref = students_df['gender_preference'].cat.codes.to_numpy()[student_order]
+    else:
+        student_pref = np.zeros(len(students_df), dtype=np.int8)
+    mentor_gender = mentors_df['gender'].cat.codes.to_numpy()[mentor_order]
+    has_gender_preference = ((student_pref == 1) | (student_pref == 2)).any()
+    if has_gender_preference:
+        forbidden = (
+            ((student_pref == 1)[:, None] & (mentor_gender != 1)[None, :])
+            | ((student_pref == 2)[:, None] & (mentor_gender != 2)[None, :])
+        )
+        cost[forbidden] = forbidden_cost
+
+    # Mentor capacity: one column per mentee slot.
+    slot_cost = np.repeat(cost, max_mentees_per_mentor, axis=1)
+    student_positions, slots = linear_sum_assignment(slot_cost)
+
+    mentor_positions = slots // max_mentees_per_mentor
+    if has_gender_preference:
+        allowed = ~forbidden[student_positions, mentor_positions]
+        student_positions = student_positions[allowed]
+        mentor_positions = mentor_positions[allowed]
+
+    return build_matches_frame(
+        students_df, mentors_df, student_order[student_positions], mentor_order[mentor_positions],
+        same_campus[student_positions, mentor_positions],
+        'Optimal Assignment + Gender Rule + Campus Preference',
+    )
 
 # --- Main Execution ---
 if __name__ == "__main__":
     MENTOR_CAPACITY = 11
+    USE_OPTIMAL_ASSIGNMENT = False  # Requires scipy; see match_by_assignment
     EXCEL_FILE_NAME = 'mentors.xlsx'
     
     try:
@@ -165,31 +353,30 @@ if __name__ == "__main__":
         
         # --- RUN MATCHING ---
         print("\nPreprocessing complete. Running the matching algorithm...")
-        matches_df = match_by_age_and_rules(
+        match_function = match_by_assignment if USE_OPTIMAL_ASSIGNMENT else match_by_age_and_rules
+        matches_df = match_function(
             students_processed, 
             mentors_processed, 
             MENTOR_CAPACITY
         )
 
         # --- SAVE RESULTS ---
-        with pd.ExcelWriter('mentor_matches_final.xlsx') as writer:
+        with pd.ExcelWriter('mentor_matches_final.xlsx', engine=EXCEL_WRITER_ENGINE) as writer:
             matches_df.to_excel(writer, sheet_name='Final Matches', index=False)
 
         print(f"\nMatching complete! Found and saved {len(matches_df)} matches.")
         print("The results have been saved to 'mentor_matches_final.xlsx'.")
 
         # --- IDENTIFY AND PRINT UNMATCHED STUDENTS ---
-        if not matches_df.empty:
-            matched_student_indices = matches_df['Student_Index'].tolist()
-            unmatched_students_df = students_processed[~students_processed.index.isin(matched_student_indices)]
-        else:
-            unmatched_students_df = students_processed
+        matched = np.zeros(len(students_processed), dtype=bool)
+        matched[students_processed.index.get_indexer(matches_df['Student_Index'])] = True
+        unmatched_students_df = students_processed.iloc[~matched]
 
         if not unmatched_students_df.empty:
             print("\n-------------------------------------------------")
             print(f"The following {len(unmatched_students_df)} students could not be matched:")
             print("-------------------------------------------------")
-            print(unmatched_students_df[['age', 'gender_preference', 'faculty', 'campus','mr./ms.','name']].to_string())
+            print(unmatched_students_df[['age', 'gender_preference', 'faculty', 'campus','mr_ms','name']].to_string())
         else:
             print("\nAll students were successfully matched!")
 